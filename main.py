@@ -1,9 +1,14 @@
 import os
 import re
-import shutil
+import time
+import uuid
 import logging
-from ebooklib import epub
-from typing import NoReturn, List, Dict, Any, Optional
+import zipfile
+import mimetypes
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from html import escape as _html_escape
+from typing import NoReturn, List, Dict, Any, Optional, Tuple, Iterator, TextIO
 from PIL import Image, ImageDraw, ImageFont
 
 # --- Logging Configuration ---
@@ -33,6 +38,27 @@ h1 {
 }
 """
 CSS_FILE_NAME = "style/main.css" # Relative path within EPUB
+# Static parts of a chapter page, pre-encoded; the title goes between PREFIX/MIDDLE and MIDDLE/H1_CLOSE
+_HTML_PREFIX = ('<!DOCTYPE html>\n'
+                '<html xmlns="http://www.w3.org/1999/xhtml" lang="zh-CN">\n<head>\n'
+                '  <meta charset="utf-8"/>\n'
+                '  <title>').encode('utf-8')
+_HTML_MIDDLE = ('</title>\n'
+                # Link the CSS file relative to the EPUB root
+                f'  <link rel="stylesheet" type="text/css" href="{CSS_FILE_NAME}"/>\n'
+                '</head>\n<body>\n'
+                '  <h1>').encode('utf-8')
+_HTML_H1_CLOSE = b'</h1>\n'
+_HTML_SUFFIX = b'</body>\n</html>'
+EPUB_CONTENT_DIR = "EPUB" # Folder inside the EPUB zip holding the package document and all content
+CONTAINER_XML = f"""<?xml version="1.0" encoding="utf-8"?>
+<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container" version="1.0">
+  <rootfiles>
+    <rootfile media-type="application/oebps-package+xml" full-path="{EPUB_CONTENT_DIR}/content.opf"/>
+  </rootfiles>
+</container>
+"""
+EPUB_COMPRESS_LEVEL = 1 # Fastest deflate; chapters are small, repetitive text, so level 6 saves little space for much more CPU
 
 import logging
 from typing import List, Dict, Any
@@ -41,6 +67,33 @@ from typing import List, Dict, Any
 DEFAULT_VOLUME_TITLE = '默认卷'
 DEFAULT_CHAPTER_TITLE = '开篇'
 
+# Characters XML 1.0 does not allow: C0 controls other than tab/LF/CR (e.g. a DOS Ctrl-Z left in old TXT
+# dumps), lone surrogates (e.g. from undecodable file names) and the U+FFFE/U+FFFF non-characters
+_XML_INVALID_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+
+def _xml_escape(text: str, quote: bool = True) -> str:
+    """Escapes text for XHTML/XML markup, replacing characters XML does not allow with U+FFFD."""
+    return _html_escape(_XML_INVALID_RE.sub('\ufffd', text), quote=quote)
+
+
+def _render_paragraph(line: str) -> bytes:
+    """Renders one content line as an escaped <p> element, UTF-8 encoded."""
+    # Escape &, < and > in a single pass
+    return f'  <p>{_xml_escape(line, quote=False)}</p>\n'.encode('utf-8')
+
+
+def _render_chapter_html(chapter: Dict[str, Any]) -> bytes:
+    """
+    将一个章节渲染为完整的HTML页面 (UTF-8 bytes)。
+    The paragraphs are already rendered, so the page is just the pre-encoded template around them.
+    :param chapter: 章节字典，包含标题和已渲染的内容。
+    """
+    # Escape and encode the title once; it appears in both <title> and <h1>
+    title = _xml_escape(chapter["title"]).encode('utf-8')
+    return b''.join((_HTML_PREFIX, title, _HTML_MIDDLE, title, _HTML_H1_CLOSE, chapter['content'], _HTML_SUFFIX))
+
+
 class MultiLevelBook:
     """
     MultiLevelBook 用于存储和管理一个多级目录的书籍结构，包括卷和章节。
@@ -51,6 +104,11 @@ class MultiLevelBook:
         初始化 MultiLevelBook 实例，创建包含默认卷和默认章节的初始结构。
         """
         self.volumes: List[Dict[str, Any]] = []
+        # References to the last volume and its last chapter (None if it has no chapters) plus a flag
+        # for the untouched initial structure, so each operation is O(1) without re-walking self.volumes
+        self._cur_vol: Optional[Dict[str, Any]] = None
+        self._cur_chap: Optional[Dict[str, Any]] = None
+        self._is_default = False
         # Start with a default volume and chapter structure immediately
         self._create_default_structure()
         logging.debug("MultiLevelBook initialized with default structure.")
@@ -58,29 +116,16 @@ class MultiLevelBook:
     def _create_default_structure(self):
         """Creates the initial default volume and chapter."""
         if not self.volumes: # Only if completely empty
-            default_chapter = {'title': DEFAULT_CHAPTER_TITLE, 'content': []}
+            default_chapter = {'title': DEFAULT_CHAPTER_TITLE, 'content': bytearray()}
             default_volume = {'title': DEFAULT_VOLUME_TITLE, 'chapters': [default_chapter]}
             self.volumes.append(default_volume)
+            self._cur_vol, self._cur_chap = default_volume, default_chapter
+            self._is_default = True
 
-    def _is_initial_default_volume_empty(self) -> bool:
-        """Checks if the book is still in its initial empty default state."""
-        return (len(self.volumes) == 1 and
-                self.volumes[0]['title'] == DEFAULT_VOLUME_TITLE and
-                len(self.volumes[0]['chapters']) == 1 and
-                self.volumes[0]['chapters'][0]['title'] == DEFAULT_CHAPTER_TITLE and
-                not self.volumes[0]['chapters'][0]['content'])
-
-    def _is_last_volume_chapterless(self) -> bool:
-        """Checks if the last volume currently has no chapters."""
-        return self.volumes and not self.volumes[-1]['chapters']
-
-    def _is_last_chapter_default_and_empty(self) -> bool:
-        """Checks if the last chapter in the last volume is the default one and empty."""
-        if self.volumes and self.volumes[-1]['chapters']:
-            last_chapter = self.volumes[-1]['chapters'][-1]
-            return (last_chapter['title'] == DEFAULT_CHAPTER_TITLE and
-                    not last_chapter['content'])
-        return False
+    @property
+    def last_chapter(self) -> Optional[Dict[str, Any]]:
+        """The last chapter of the last volume, or None if that volume has no chapters."""
+        return self._cur_chap
 
     def add_volume(self, title: str) -> None:
         """
@@ -88,17 +133,18 @@ class MultiLevelBook:
         如果当前只有一个空的默认卷，则重命名该卷。否则，添加新卷。
         :param title: 新卷的标题，类型为字符串。
         """
-        if self._is_initial_default_volume_empty():
-            self.volumes[0]['title'] = title
+        if self._is_default:
+            self._cur_vol['title'] = title
+            self._is_default = False
             logging.info(f"Renamed initial default volume to: {title}")
         else:
             # Ensure the previous volume wasn't left chapterless unnecessarily
-            if self._is_last_volume_chapterless():
-                 logging.warning(f"Adding new volume '{title}', but previous volume '{self.volumes[-1]['title']}' had no chapters.")
-                 # Optionally add a default chapter to the previous one here if desired?
-                 # self.add_chapter_to_volume(len(self.volumes) - 1, DEFAULT_CHAPTER_TITLE)
+            if self._cur_vol is not None and self._cur_chap is None:
+                 logging.warning(f"Adding new volume '{title}', but previous volume '{self._cur_vol['title']}' had no chapters.")
 
-            self.volumes.append({'title': title, 'chapters': []}) # New volumes start with no chapters
+            volume = {'title': title, 'chapters': []} # New volumes start with no chapters
+            self.volumes.append(volume)
+            self._cur_vol, self._cur_chap = volume, None
             logging.info(f"Added volume: {title}")
 
     def add_chapter_to_last_volume(self, title: str, content: List[str] = None) -> None:
@@ -106,59 +152,72 @@ class MultiLevelBook:
         在最后一个卷中添加一个新章节。
         如果最后一个卷没有章节，或者最后一个章节是空的默认章节，则替换/设置它。否则，追加新章节。
         :param title: 新章节的标题，类型为字符串。
-        :param content: 新章节的内容列表，类型为字符串列表，如果没有提供，默认为空列表。
+        :param content: 新章节的内容行列表，类型为字符串列表，如果没有提供，默认为空。
         """
-        if content is None:
-            content = []
+        content = bytearray().join(_render_paragraph(line) for line in content or ())
 
-        if not self.volumes:
+        if self._cur_vol is None:
             # This case should not happen due to __init__, but as a safeguard:
             self._create_default_structure()
             logging.warning("Attempted to add chapter when no volumes existed. Created default structure.")
 
-        last_volume = self.volumes[-1]
-
-        # If the last volume has no chapters OR if its last chapter is the empty default one
-        if not last_volume['chapters'] or self._is_last_chapter_default_and_empty():
-             if last_volume['chapters']: # Replace the empty default chapter
-                 last_volume['chapters'][-1]['title'] = title
-                 last_volume['chapters'][-1]['content'] = content
-                 logging.info(f"Replaced default chapter in volume '{last_volume['title']}' with: {title}")
-             else: # Add as the first chapter
-                 last_volume['chapters'].append({'title': title, 'content': content})
-                 logging.info(f"Added first chapter '{title}' to volume '{last_volume['title']}'")
-        else: # Append as a new chapter
-            last_volume['chapters'].append({'title': title, 'content': content})
-            logging.info(f"Appended chapter '{title}' to volume '{last_volume['title']}'")
+        self._is_default = False
+        last_chapter = self._cur_chap
+        if last_chapter is not None and last_chapter['title'] == DEFAULT_CHAPTER_TITLE and not last_chapter['content']:
+            # Replace the empty default chapter
+            last_chapter['title'] = title
+            last_chapter['content'] = content
+            logging.info(f"Replaced default chapter in volume '{self._cur_vol['title']}' with: {title}")
+        else:
+            chapter = {'title': title, 'content': content}
+            self._cur_vol['chapters'].append(chapter)
+            self._cur_chap = chapter
+            if last_chapter is None:
+                logging.info(f"Added first chapter '{title}' to volume '{self._cur_vol['title']}'")
+            else:
+                logging.info(f"Appended chapter '{title}' to volume '{self._cur_vol['title']}'")
 
     def add_content_to_last_chapter(self, line: str) -> None:
         """
         向最后一个卷的最后一个章节添加内容行。
         如果最后一个卷没有章节，会自动添加一个默认章节。
+        The line is stored already rendered as an escaped, UTF-8 encoded <p> element: a chapter's
+        content is one contiguous bytearray rather than a list of many small strings.
         :param line: 要添加到最后一个章节的内容行，类型为字符串。
         """
-        if not self.volumes:
-            # Safeguard, should be handled by __init__
-            self._create_default_structure()
-            logging.warning("Attempted to add content when no volumes existed. Created default structure.")
-
-        # Ensure the last volume has at least one chapter before adding content
-        if self._is_last_volume_chapterless():
-            logging.warning(f"Volume '{self.volumes[-1]['title']}' had no chapters when adding content. Adding default chapter '{DEFAULT_CHAPTER_TITLE}'.")
-            self.add_chapter_to_last_volume(DEFAULT_CHAPTER_TITLE) # Add a default chapter
-
-        # Now we are sure the last volume has at least one chapter
-        try:
-            self.volumes[-1]['chapters'][-1]['content'].append(line)
-            # logging.debug(f"Added content line to {self.volumes[-1]['title']} / {self.volumes[-1]['chapters'][-1]['title']}")
-        except IndexError:
-             # This catch might be redundant now but kept as extra safety
-             logging.error("Critical error: Could not find chapter to add content to, even after checks.")
-             # Fallback: try creating default structure again? Or raise error?
-             self._create_default_structure()
-             if self.volumes and self.volumes[-1]['chapters']:
-                  self.volumes[-1]['chapters'][-1]['content'].append(line)
+        if self._cur_chap is None:
+            if self._cur_vol is None:
+                # Safeguard, should be handled by __init__
+                self._create_default_structure()
+                logging.warning("Attempted to add content when no volumes existed. Created default structure.")
+            else:
+                # Ensure the last volume has at least one chapter before adding content
+                logging.warning(f"Volume '{self._cur_vol['title']}' had no chapters when adding content. Adding default chapter '{DEFAULT_CHAPTER_TITLE}'.")
+                self.add_chapter_to_last_volume(DEFAULT_CHAPTER_TITLE) # Add a default chapter
+
+        self._cur_chap['content'] += _render_paragraph(line)
+        self._is_default = False
+
+    def remove_last_chapter(self) -> Dict[str, Any]:
+        """
+        移除并返回最后一个卷的最后一个章节。
+        :return: 被移除的章节字典。
+        """
+        chapter = self._cur_vol['chapters'].pop()
+        self._cur_chap = self._cur_vol['chapters'][-1] if self._cur_vol['chapters'] else None
+        self._is_default = False
+        return chapter
 
+    def remove_last_volume(self) -> Dict[str, Any]:
+        """
+        移除并返回最后一个卷。
+        :return: 被移除的卷字典。
+        """
+        volume = self.volumes.pop()
+        self._cur_vol = self.volumes[-1] if self.volumes else None
+        self._cur_chap = self._cur_vol['chapters'][-1] if self._cur_vol and self._cur_vol['chapters'] else None
+        self._is_default = False
+        return volume
 
 
 class TextBookParser:
@@ -171,12 +230,15 @@ class TextBookParser:
     TITLE_PATTERN = r"^[\s\u3000]*([第卷][0-9一二三四五六七八九十零〇百千两]+[卷])?[\s\u3000]*([第章节回部节集篇辑][0-9一二三四五六七八九十零〇百千两]+[章节回部节集篇辑])?[\s\u3000]*(.*)"
     # Simpler pattern focusing on common structures, might need adjustment for complex cases
     TITLE_PATTERN_SIMPLE = r"^[\s\u3000]*[第卷][0-9一二三四五六七八九十零〇百千两]+[章回部节集卷篇辑][\s\u3000]*.*"
+    # Number of characters decoded per read when scanning the TXT file
+    READ_BLOCK_SIZE = 4 * 1024 * 1024
 
 
     @staticmethod
     def read(file_path: str) -> Optional[MultiLevelBook]:
         """
         读取文本文件并解析成一个多级书籍结构。
+        Content lines are stored as ready-made HTML paragraphs (see MultiLevelBook.add_content_to_last_chapter).
         :param file_path: TXT文件的路径。
         :return: MultiLevelBook对象，包含解析后的卷和章节信息，或在文件无法读取时返回 None。
         """
@@ -184,23 +246,26 @@ class TextBookParser:
 
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
-                for line in file:
+                for line in TextBookParser._iter_lines(file):
                     line = line.strip()
                     if not line: # Skip empty lines
                         continue
 
-                    # Check if the line matches the title pattern
-                    match = re.match(TextBookParser.TITLE_PATTERN_SIMPLE, line)
+                    # Check if the line matches the title pattern; lines are stripped, so only
+                    # those starting with a title marker can match and the rest skip the regex
+                    match = _TITLE_RE.match(line) if line[0] in _TITLE_FIRST_CHARS else None
                     if match:
                         title_text = line # Use the full line as title for simplicity
 
                         # Heuristic to differentiate volumes from chapters
                         # This might need refinement based on actual book formats
-                        if "卷" in title_text and ("章" not in title_text and "回" not in title_text and "节" not in title_text):
+                        # A volume title contains "卷" but none of the chapter markers
+                        kinds = {m.lastgroup for m in _KIND_RE.finditer(title_text)}
+                        if "vol" in kinds and "chap" not in kinds:
                             logging.info(f"Detected Volume Title: {title_text}")
                             # Check if the last chapter of the previous volume was empty, if so, remove it
-                            if multi_level_book.volumes and multi_level_book.volumes[-1]['chapters'] and not multi_level_book.volumes[-1]['chapters'][-1]['content']:
-                                removed_chapter = multi_level_book.volumes[-1]['chapters'].pop()
+                            if multi_level_book.last_chapter is not None and not multi_level_book.last_chapter['content']:
+                                removed_chapter = multi_level_book.remove_last_chapter()
                                 logging.info(f"Removed empty chapter '{removed_chapter['title']}' before adding new volume.")
                             multi_level_book.add_volume(title_text)
                             # After adding a new volume, we expect a chapter next,
@@ -215,17 +280,16 @@ class TextBookParser:
             # Final check: remove trailing empty default chapter/volume if they exist
             if multi_level_book.volumes:
                 last_volume = multi_level_book.volumes[-1]
-                if last_volume['chapters']:
-                    last_chapter = last_volume['chapters'][-1]
+                last_chapter = multi_level_book.last_chapter
+                if last_chapter is not None:
                     if not last_chapter['content'] and last_chapter['title'] in [DEFAULT_CHAPTER_TITLE, DEFAULT_VOLUME_TITLE]: # Check if it's an empty default
-                         last_volume['chapters'].pop()
+                         multi_level_book.remove_last_chapter()
                          logging.info(f"Removed trailing empty default chapter '{last_chapter['title']}'.")
                 # If removing the chapter made the volume empty, and it's a default volume, remove it too
                 if not last_volume['chapters'] and last_volume['title'] == DEFAULT_VOLUME_TITLE and len(multi_level_book.volumes) > 1:
-                    multi_level_book.volumes.pop()
+                    multi_level_book.remove_last_volume()
                     logging.info("Removed trailing empty default volume.")
 
-
             return multi_level_book
 
         except FileNotFoundError:
@@ -236,52 +300,44 @@ class TextBookParser:
             return None
 
     @staticmethod
-    def save_chapters_as_html(multi_level_book: MultiLevelBook, output_folder: str) -> bool:
+    def _iter_lines(file: TextIO) -> Iterator[str]:
         """
-        将书籍的每个章节保存为HTML文件，使用编号来命名文件。
-        Includes basic CSS linking.
-        :param multi_level_book: 包含卷和章节信息的MultiLevelBook对象。
-        :param output_folder: HTML文件保存的目录。
-        :return: True if successful, False otherwise.
+        Yields the lines of a text file (without line endings), decoding it in large blocks
+        rather than line by line. A partial last line of a block is carried over to the next one.
         """
-        if not multi_level_book or not multi_level_book.volumes:
-            logging.warning("No volumes found in the book structure to save.")
-            return False
-
-        os.makedirs(output_folder, exist_ok=True)
-        success = True
+        tail = ''
+        while True:
+            block = file.read(TextBookParser.READ_BLOCK_SIZE)
+            if not block:
+                break
+            lines = (tail + block).split('\n')
+            tail = lines.pop()
+            yield from lines
+        if tail:
+            yield tail
+
+
+# Compiled once at import time; the parser matches every line of the TXT file against it
+_TITLE_RE = re.compile(TextBookParser.TITLE_PATTERN_SIMPLE)
+# Characters a stripped line must start with to possibly match _TITLE_RE
+_TITLE_FIRST_CHARS = frozenset('第卷')
+# Volume/chapter markers looked for inside a matched title, scanned in a single pass
+_KIND_RE = re.compile(r"(?P<chap>[章回节])|(?P<vol>卷)")
+
+@lru_cache(maxsize=8)
+def _load_font(path: str, size: int) -> Optional[ImageFont.FreeTypeFont]:
+    """
+    Loads a TrueType font, or returns None if it cannot be opened.
+    Cached per (path, size) so a batch run parses the font file once instead of once per cover.
+    """
+    try:
+        return ImageFont.truetype(path, size)
+    except IOError:
+        return None
 
-        for volume_index, volume in enumerate(multi_level_book.volumes, start=1):
-            for chapter_index, chapter in enumerate(volume['chapters'], start=1):
-                # Use numbering for filenames: "vol_chap.html" (e.g., "001_001.html")
-                file_name = f"{volume_index:03}_{chapter_index:03}.html"
-                file_path = os.path.join(output_folder, file_name)
-                logging.debug(f"Generating HTML file: {file_path}")
+# Blank generated-cover background (600x800, light grey), filled once and copied for each book
+_COVER_TEMPLATE = Image.new('RGB', (600, 800), (240, 240, 240))
 
-                try:
-                    with open(file_path, 'w', encoding='utf-8') as chapter_file:
-                        chapter_file.write('<!DOCTYPE html>\n')
-                        chapter_file.write('<html xmlns="http://www.w3.org/1999/xhtml" lang="zh-CN">\n<head>\n')
-                        chapter_file.write(f'  <meta charset="utf-8"/>\n')
-                        chapter_file.write(f'  <title>{chapter["title"]}</title>\n')
-                        # Link the CSS file relative to the EPUB root
-                        chapter_file.write(f'  <link rel="stylesheet" type="text/css" href="{CSS_FILE_NAME}"/>\n')
-                        chapter_file.write('</head>\n<body>\n')
-                        chapter_file.write(f'  <h1>{chapter["title"]}</h1>\n')
-                        # Write each line of content as a separate paragraph
-                        for line in chapter['content']:
-                            # Basic HTML escaping for safety, though full escaping might be needed
-                            escaped_line = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                            chapter_file.write(f'  <p>{escaped_line}</p>\n')
-                        chapter_file.write('</body>\n</html>')
-                except IOError as e:
-                    logging.error(f"Failed to write HTML file {file_path}: {e}")
-                    success = False
-                except Exception as e:
-                     logging.error(f"An unexpected error occurred while writing {file_path}: {e}")
-                     success = False
-
-        return success
 
 class TxtToEpubConverter:
     def __init__(self, txt_path: str, epub_path: str, book_title: str, author_name: str,
@@ -295,7 +351,7 @@ class TxtToEpubConverter:
         :param book_title: 电子书标题。
         :param author_name: 作者名。
         :param cover_image: 封面图片文件的路径 (可选)。
-        :param output_folder: 存放临时HTML章节文件的目录。
+        :param output_folder: 存放临时文件 (如生成的封面) 的目录。
         :param progress_callback: 回调函数，用于报告进度 (0-100)。
         """
         self.txt_path = txt_path
@@ -306,6 +362,7 @@ class TxtToEpubConverter:
         self.output_folder = output_folder
         self.progress_callback = progress_callback
         self.generated_cover_path: Optional[str] = None
+        self._artifact_paths: List[str] = [] # Temporary files written to output_folder, removed by cleanup()
 
     def _update_progress(self, value: int):
         """Safely calls the progress callback."""
@@ -320,21 +377,19 @@ class TxtToEpubConverter:
         Generates a simple cover image if no cover is provided.
         :return: Path to the generated cover image, or None if failed.
         """
-        width, height = 600, 800
-        background_color = (240, 240, 240) # Light grey background
+        width, height = _COVER_TEMPLATE.size
         font_color = (50, 50, 50) # Dark grey text
         cover_path = os.path.join(self.output_folder, 'cover.jpg')
 
         try:
-            image = Image.new('RGB', (width, height), background_color)
+            image = _COVER_TEMPLATE.copy() # Only the title differs between covers
             draw = ImageDraw.Draw(image)
 
             # Attempt to load a default font (consider allowing custom fonts)
-            try:
-                # Use a slightly larger default font size if possible
-                font_size = 40
-                font = ImageFont.truetype("arial.ttf", font_size) # Try common Arial
-            except IOError:
+            # Use a slightly larger default font size if possible
+            font_size = 40
+            font = _load_font("arial.ttf", font_size) # Try common Arial
+            if font is None:
                  try:
                      font_size = 30 # Try again with default load (might be small)
                      font = ImageFont.load_default()
@@ -344,18 +399,24 @@ class TxtToEpubConverter:
                      return None
 
             # Calculate text position for centering
-            # Use textbbox for more accurate centering with different fonts/sizes
-            text_bbox = draw.textbbox((0, 0), self.book_title, font=font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
+            # Advance width plus the font's line metrics; cheaper than rasterizing a full bounding box
+            text_width = draw.textlength(self.book_title, font=font)
+            try:
+                ascent, descent = font.getmetrics()
+                text_height = ascent + descent
+            except AttributeError: # Old bitmap default fonts have no metrics
+                text_bbox = draw.textbbox((0, 0), self.book_title, font=font)
+                text_height = text_bbox[3] - text_bbox[1]
             text_x = (width - text_width) / 2
             text_y = (height - text_height) / 2
 
             draw.text((text_x, text_y), self.book_title, fill=font_color, font=font)
 
-            image.save(cover_path, "JPEG") # Specify format
+            # Skip libjpeg's extra Huffman-optimization pass; it buys little on a flat background
+            image.save(cover_path, "JPEG", quality=85, optimize=False)
             logging.info(f"Generated default cover image at: {cover_path}")
-            self.generated_cover_path = cover_path # Store path for cleanup
+            self.generated_cover_path = cover_path
+            self._artifact_paths.append(cover_path) # Store path for cleanup
             return cover_path
         except ImportError:
              logging.error("PIL (Pillow) is required for cover generation but seems unavailable.")
@@ -378,142 +439,57 @@ class TxtToEpubConverter:
              logging.error(f"Failed to create output directory {self.output_folder}: {e}")
              return # Cannot proceed without output folder
 
-        # 2. Parse the TXT file
+        # Start generating the default cover right away if one is needed; PIL releases the GIL
+        # while encoding, so it runs alongside parsing
+        use_provided_cover = bool(self.cover_image_path and os.path.isfile(self.cover_image_path))
+        cover_future: Optional[Future] = None
+        if not use_provided_cover:
+            if self.cover_image_path:
+                 logging.warning(f"Provided cover image path not found: {self.cover_image_path}. Generating default cover.")
+            cover_executor = ThreadPoolExecutor(max_workers=1)
+            cover_future = cover_executor.submit(self.generate_cover)
+            cover_executor.shutdown(wait=False) # The submitted cover still completes
+
+        # 2. Parse the TXT file, rendering each chapter as HTML along the way
         logging.info("Parsing TXT file...")
         parser = TextBookParser()
         book_structure = parser.read(self.txt_path)
         if book_structure is None:
             logging.error("Failed to parse TXT file. Aborting conversion.")
+            if cover_future:
+                cover_future.result() # Let the cover finish writing before its folder is removed
             self.cleanup()
             return
-        self._update_progress(15) # Progress after parsing
-
-        # 3. Save chapters as HTML files
-        logging.info("Saving chapters as HTML files...")
-        if not parser.save_chapters_as_html(book_structure, self.output_folder):
-             logging.error("Failed to save chapters as HTML. Aborting conversion.")
-             self.cleanup()
-             return
-        self._update_progress(40) # Progress after HTML generation
-
-        # 4. Create EPUB book and set metadata
-        book = epub.EpubBook()
-        book.set_identifier(f"urn:uuid:{os.path.basename(self.txt_path)}-{hash(self.book_title)}") # Basic unique ID
-        book.set_title(self.book_title)
-        book.set_language('zh-cn')
-        book.add_author(self.author_name)
-
-        # 5. Add cover image
-        final_cover_path = None
-        if self.cover_image_path and os.path.isfile(self.cover_image_path):
+        self._update_progress(40) # Progress after parsing and HTML generation
+
+        # 3. Resolve the cover image
+        if use_provided_cover:
             final_cover_path = self.cover_image_path
             logging.info(f"Using provided cover image: {final_cover_path}")
         else:
-            if self.cover_image_path:
-                 logging.warning(f"Provided cover image path not found: {self.cover_image_path}. Generating default cover.")
-            final_cover_path = self.generate_cover()
+            final_cover_path = cover_future.result()
 
+        cover: Optional[Tuple[str, str, bytes]] = None # (file name, media type, data)
         if final_cover_path and os.path.isfile(final_cover_path):
+            cover_ext = os.path.splitext(final_cover_path)[1].lower()
+            # Label the image by its extension (GIF, WebP, ...); fall back to JPEG if it is not a known image type
+            media_type = mimetypes.guess_type(final_cover_path)[0]
+            if not media_type or not media_type.startswith('image/'):
+                media_type = 'image/jpeg'
             try:
-                cover_filename = os.path.basename(final_cover_path)
                 with open(final_cover_path, 'rb') as cover_file:
-                    book.set_cover(cover_filename, cover_file.read())
-                # Add the cover image explicitly as an item if it wasn't generated by us
-                # (ebooklib adds the generated one automatically when set_cover is used)
-                # if final_cover_path != self.generated_cover_path:
-                #    book.add_item(epub.EpubImage(uid='cover-image', file_name=cover_filename, media_type='image/jpeg', content=open(final_cover_path, 'rb').read()))
-
+                    cover = (f"cover{cover_ext}", media_type, cover_file.read())
             except IOError as e:
                  logging.error(f"Failed to read cover image file {final_cover_path}: {e}")
-            except Exception as e:
-                 logging.error(f"Failed to set cover image: {e}")
         else:
              logging.warning("No valid cover image found or generated.")
 
         self._update_progress(50) # Progress after cover handling
 
-        # 6. Prepare EPUB book structure (TOC, Spine, CSS)
-        spine: List[Any] = ['nav'] # Start spine with nav
-        toc: List[Any] = []
-
-        # Create and add CSS item
-        style_css = epub.EpubItem(uid="style_main", file_name=CSS_FILE_NAME,
-                                  media_type="text/css", content=CSS_STYLE_CONTENT.encode('utf-8'))
-        book.add_item(style_css)
-
-        total_chapters = sum(len(volume.get('chapters', [])) for volume in book_structure.volumes)
-        chapters_processed = 0
-        logging.info("Adding chapters to EPUB...")
-
-        # 7. Iterate through book structure and add items to EPUB
-        for volume_index, volume in enumerate(book_structure.volumes, start=1):
-            volume_title = volume.get('title', f'Volume {volume_index}')
-            volume_chapters = volume.get('chapters', [])
-
-            # Create a list for chapter links within this volume section in TOC
-            toc_volume_chapters = []
-
-            for chapter_index, chapter in enumerate(volume_chapters, start=1):
-                chapter_title = chapter.get('title', f'Chapter {chapter_index}')
-                html_file_name = f"{volume_index:03}_{chapter_index:03}.html"
-                html_file_path = os.path.join(self.output_folder, html_file_name)
-
-                try:
-                    with open(html_file_path, 'r', encoding="utf-8") as f:
-                        html_content = f.read()
-
-                    # Create EpubHtml item for the chapter
-                    chapter_item = epub.EpubHtml(title=chapter_title,
-                                                 file_name=html_file_name,
-                                                 lang='zh-cn',
-                                                 content=html_content.encode('utf-8')) # Content needs to be bytes
-
-                    # Link the CSS file to this chapter
-                    chapter_item.add_item(style_css) # ebooklib < 0.18
-                    # chapter_item.add_link(href=CSS_FILE_NAME, rel='stylesheet', type='text/css') # ebooklib >= 0.18
-
-
-                    book.add_item(chapter_item)
-                    spine.append(chapter_item) # Add chapter to reading order
-                    # Add chapter link to the current volume's list for TOC
-                    toc_volume_chapters.append(epub.Link(html_file_name, chapter_title, f"vol{volume_index}-chap{chapter_index}"))
-
-                    chapters_processed += 1
-                    # Dynamic progress update
-                    progress = 50 + int((chapters_processed / total_chapters) * 45) # Chapters take up 45%
-                    self._update_progress(progress)
-
-                except FileNotFoundError:
-                    logging.error(f"HTML chapter file not found: {html_file_path}. Skipping chapter.")
-                except IOError as e:
-                    logging.error(f"Failed to read HTML chapter file {html_file_path}: {e}. Skipping chapter.")
-                except Exception as e:
-                    logging.error(f"Error processing chapter '{chapter_title}': {e}. Skipping chapter.")
-
-
-            # Add the volume section to the main TOC only if it has chapters
-            if toc_volume_chapters:
-                 # Use the first chapter item as the href for the section title, or create a dummy page?
-                 # Using the first chapter's link is common practice.
-                 # toc.append(epub.Section(volume_title, href=toc_volume_chapters[0].href)) # Section Title
-                 # toc.extend(toc_volume_chapters) # Add chapter links under the section
-
-                 # Alternative: Nested TOC structure
-                 toc.append((epub.Section(volume_title), tuple(toc_volume_chapters)))
-
-
-        # 8. Set EPUB spine and TOC
-        book.spine = spine
-        book.toc = tuple(toc) # Convert list of tuples/links to tuple
-
-        # 9. Add standard EPUB items (NCX, Nav)
-        book.add_item(epub.EpubNcx())
-        book.add_item(epub.EpubNav())
-
-        # 10. Write EPUB file
+        # 4. Write the EPUB file
         logging.info(f"Writing EPUB file to: {self.epub_path}")
         try:
-            epub.write_epub(self.epub_path, book, {})
+            self._write_epub(book_structure, cover)
             self._update_progress(98) # Progress before cleanup
             logging.info("EPUB file created successfully.")
         except Exception as e:
@@ -521,29 +497,174 @@ class TxtToEpubConverter:
             # Don't cleanup if EPUB writing failed, user might want intermediate files
             return # Stop here
 
-        # 11. Cleanup temporary files
+        # 5. Cleanup temporary files
         self.cleanup()
         self._update_progress(100) # Final progress
         logging.info(f"Conversion complete for '{self.book_title}'.")
 
 
+    def _write_epub(self, book_structure: MultiLevelBook, cover: Optional[Tuple[str, str, bytes]]) -> None:
+        """
+        将书籍直接写成EPUB (zip) 文件：container、OPF、NCX、导航页、样式、封面和各章节。
+        :param book_structure: 解析后的书籍结构。
+        :param cover: (文件名, 媒体类型, 图片数据)，没有封面时为 None。
+        """
+        title = _xml_escape(self.book_title)
+        # Derived from file name and title (not hash(), which is salted per process) so re-converting
+        # the same book keeps the same identifier. Lone surrogates (e.g. from undecodable file-name bytes)
+        # become U+FFFD, since uuid5 needs a name that encodes as UTF-8
+        uuid_name = f"{os.path.basename(self.txt_path)}:{self.book_title}"
+        uuid_name = uuid_name.encode('utf-8', 'surrogatepass').decode('utf-8', 'replace')
+        book_uuid = uuid.uuid5(uuid.NAMESPACE_URL, uuid_name)
+        identifier = f"urn:uuid:{book_uuid}"
+
+        # Collect (volume title, [(file name, chapter title, chapter)]) for the TOC; skip chapterless volumes
+        toc: List[Tuple[str, List[Tuple[str, str, Dict[str, Any]]]]] = []
+        for volume_index, volume in enumerate(book_structure.volumes, start=1):
+            toc_volume_chapters = [(f"{volume_index:03}_{chapter_index:03}.html",
+                                    chapter.get('title', f'Chapter {chapter_index}'), chapter)
+                                   for chapter_index, chapter in enumerate(volume.get('chapters', []), start=1)]
+            if toc_volume_chapters:
+                toc.append((volume.get('title', f'Volume {volume_index}'), toc_volume_chapters))
+        total_chapters = sum(len(chapters) for _, chapters in toc)
+
+        # Package document: metadata, manifest and reading order (spine)
+        manifest = [f'    <item id="style_main" href="{CSS_FILE_NAME}" media-type="text/css"/>',
+                    '    <item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>',
+                    '    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>']
+        spine = ['    <itemref idref="nav"/>']
+        cover_meta = ''
+        if cover:
+            cover_meta = '\n    <meta name="cover" content="cover-img"/>'
+            manifest.append(f'    <item id="cover-img" href="{cover[0]}" media-type="{cover[1]}" properties="cover-image"/>')
+            manifest.append('    <item id="cover" href="cover.xhtml" media-type="application/xhtml+xml"/>')
+            spine.insert(0, '    <itemref idref="cover" linear="no"/>')
+        for volume_index, (_, chapters) in enumerate(toc, start=1):
+            for chapter_index, (file_name, _, _) in enumerate(chapters, start=1):
+                item_id = f"vol{volume_index}-chap{chapter_index}"
+                manifest.append(f'    <item id="{item_id}" href="{file_name}" media-type="application/xhtml+xml"/>')
+                spine.append(f'    <itemref idref="{item_id}"/>')
+        newline = '\n'
+        content_opf = f"""<?xml version="1.0" encoding="utf-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" unique-identifier="id" version="3.0">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="id">{identifier}</dc:identifier>
+    <dc:title>{title}</dc:title>
+    <dc:language>zh-cn</dc:language>
+    <dc:creator id="creator">{_xml_escape(self.author_name)}</dc:creator>
+    <meta property="dcterms:modified">{time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}</meta>{cover_meta}
+  </metadata>
+  <manifest>
+{newline.join(manifest)}
+  </manifest>
+  <spine toc="ncx">
+{newline.join(spine)}
+  </spine>
+</package>
+"""
+
+        # Navigation: EPUB 2 NCX and EPUB 3 nav document, one section per volume
+        nav_points = []
+        nav_items = []
+        for volume_index, (volume_title, chapters) in enumerate(toc, start=1):
+            volume_title = _xml_escape(volume_title)
+            nav_points.append(f'    <navPoint id="vol{volume_index}">\n'
+                              f'      <navLabel><text>{volume_title}</text></navLabel>\n'
+                              f'      <content src="{chapters[0][0]}"/>')
+            nav_items.append(f'        <li>\n          <span>{volume_title}</span>\n          <ol>')
+            for chapter_index, (file_name, chapter_title, _) in enumerate(chapters, start=1):
+                chapter_title = _xml_escape(chapter_title)
+                nav_points.append(f'      <navPoint id="vol{volume_index}-chap{chapter_index}">\n'
+                                  f'        <navLabel><text>{chapter_title}</text></navLabel>\n'
+                                  f'        <content src="{file_name}"/>\n'
+                                  f'      </navPoint>')
+                nav_items.append(f'            <li><a href="{file_name}">{chapter_title}</a></li>')
+            nav_points.append('    </navPoint>')
+            nav_items.append('          </ol>\n        </li>')
+        toc_ncx = f"""<?xml version="1.0" encoding="utf-8"?>
+<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
+  <head>
+    <meta name="dtb:uid" content="{identifier}"/>
+    <meta name="dtb:depth" content="2"/>
+    <meta name="dtb:totalPageCount" content="0"/>
+    <meta name="dtb:maxPageNumber" content="0"/>
+  </head>
+  <docTitle><text>{title}</text></docTitle>
+  <navMap>
+{newline.join(nav_points)}
+  </navMap>
+</ncx>
+"""
+        nav_xhtml = f"""<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="zh-CN" xml:lang="zh-CN">
+<head>
+  <title>{title}</title>
+</head>
+<body>
+  <nav epub:type="toc" id="toc" role="doc-toc">
+    <h2>{title}</h2>
+    <ol>
+{newline.join(nav_items)}
+    </ol>
+  </nav>
+</body>
+</html>
+"""
+
+        with zipfile.ZipFile(self.epub_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=EPUB_COMPRESS_LEVEL) as epub_zip:
+            # The mimetype entry must come first and be stored uncompressed
+            epub_zip.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+            epub_zip.writestr('META-INF/container.xml', CONTAINER_XML)
+            epub_zip.writestr(f'{EPUB_CONTENT_DIR}/content.opf', content_opf)
+            epub_zip.writestr(f'{EPUB_CONTENT_DIR}/toc.ncx', toc_ncx)
+            epub_zip.writestr(f'{EPUB_CONTENT_DIR}/nav.xhtml', nav_xhtml)
+            epub_zip.writestr(f'{EPUB_CONTENT_DIR}/{CSS_FILE_NAME}', CSS_STYLE_CONTENT)
+            if cover:
+                epub_zip.writestr(f'{EPUB_CONTENT_DIR}/{cover[0]}', cover[2])
+                epub_zip.writestr(f'{EPUB_CONTENT_DIR}/cover.xhtml', f"""<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" lang="zh-CN" xml:lang="zh-CN">
+<head>
+  <title>Cover</title>
+</head>
+<body>
+  <img src="{cover[0]}" alt="Cover"/>
+</body>
+</html>
+""")
+
+            chapters_processed = 0
+            for _, chapters in toc:
+                for file_name, _, chapter in chapters:
+                    # Pages are assembled one at a time, only as they are written
+                    epub_zip.writestr(f'{EPUB_CONTENT_DIR}/{file_name}', _render_chapter_html(chapter))
+                    chapters_processed += 1
+                    # Dynamic progress update
+                    progress = 50 + int((chapters_processed / total_chapters) * 45) # Chapters take up 45%
+                    self._update_progress(progress)
+
     def cleanup(self) -> NoReturn:
         """
-        清理输出目录中的所有临时文件和生成的封面。
+        清理转换器写入输出目录的临时文件 (生成的封面)，并删除空的输出目录。
         """
         logging.info(f"Cleaning up temporary files in {self.output_folder}...")
         if os.path.isdir(self.output_folder):
             try:
-                # Remove generated cover first if it exists inside the folder
-                if self.generated_cover_path and os.path.dirname(self.generated_cover_path) == self.output_folder:
-                    if os.path.isfile(self.generated_cover_path):
-                        os.unlink(self.generated_cover_path)
-                        logging.debug(f"Removed generated cover: {self.generated_cover_path}")
-
-                # Remove the rest of the folder contents (HTML files)
-                # Using rmtree is simpler if the whole folder is temporary
-                shutil.rmtree(self.output_folder)
-                logging.info(f"Removed temporary directory: {self.output_folder}")
+                # Remove exactly the files this converter wrote, then the (now empty) folder
+                for artifact_path in self._artifact_paths:
+                    try:
+                        os.unlink(artifact_path)
+                        logging.debug(f"Removed temporary file: {artifact_path}")
+                    except FileNotFoundError:
+                        pass
+                self._artifact_paths.clear()
+                try:
+                    os.rmdir(self.output_folder)
+                    logging.info(f"Removed temporary directory: {self.output_folder}")
+                except OSError as e:
+                    # Expected when the folder also holds files this converter didn't write
+                    logging.warning(f"Kept output directory {self.output_folder} because it is not empty: {e}")
 
             except OSError as e:
                 logging.error(f"Error during cleanup of {self.output_folder}: {e}")
@@ -553,6 +674,30 @@ class TxtToEpubConverter:
             logging.info("Temporary folder not found, skipping cleanup.")
 
 
+def _convert_one(job: Tuple[str, str, str, str, str, Optional[str]]) -> None:
+    """
+    转换单个txt文件，在 convert_all_txt_in_directory 的工作进程中运行。
+    :param job: (txt_file, txt_path, epub_path, book_title, author_name, cover_image_path)
+    """
+    txt_file, txt_path, epub_path, book_title, author_name, cover_image_path = job
+    # Each worker process gets its own temporary folder so concurrent conversions don't collide
+    output_folder = f"{HTML_OUTPUT_FOLDER}_{os.getpid()}"
+
+    logging.info(f"--- Processing file: {txt_file} ---")
+    converter = TxtToEpubConverter(txt_path, epub_path, book_title, author_name, cover_image_path,
+                                   output_folder=output_folder)
+
+    try:
+        converter.convert()
+        logging.info(f"--- Finished processing: {txt_file} ---")
+    except Exception as e:
+        # Catch errors during conversion of a single file
+        logging.error(f"!!! Failed to convert {txt_file}: {e} !!!")
+        # Optionally cleanup if converter failed mid-way and left files
+        converter.cleanup()
+        logging.info(f"--- Aborted processing: {txt_file} ---")
+
+
 def convert_all_txt_in_directory(directory_path: str):
     """
     遍历指定目录，自动处理其中的所有txt文件，转换为epub文件。
@@ -571,6 +716,7 @@ def convert_all_txt_in_directory(directory_path: str):
 
     logging.info(f"Found {len(txt_files)} TXT file(s) to convert.")
 
+    jobs: List[Tuple[str, str, str, str, str, Optional[str]]] = []
     for txt_file in txt_files:
         base_name = os.path.splitext(txt_file)[0]
         txt_path = os.path.join(directory_path, txt_file)
@@ -587,18 +733,19 @@ def convert_all_txt_in_directory(directory_path: str):
         book_title = base_name # Use filename as title
         author_name = DEFAULT_AUTHOR # Default author
 
-        logging.info(f"--- Processing file: {txt_file} ---")
-        converter = TxtToEpubConverter(txt_path, epub_path, book_title, author_name, cover_image_path)
+        jobs.append((txt_file, txt_path, epub_path, book_title, author_name, cover_image_path))
 
-        try:
-            converter.convert()
-            logging.info(f"--- Finished processing: {txt_file} ---")
-        except Exception as e:
-            # Catch errors during conversion of a single file
-            logging.error(f"!!! Failed to convert {txt_file}: {e} !!!")
-            # Optionally cleanup if converter failed mid-way and left files
-            converter.cleanup()
-            logging.info(f"--- Aborted processing: {txt_file} ---")
+    # Books are independent and CPU-bound, so convert them in parallel worker processes
+    with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+        futures = {executor.submit(_convert_one, job): job[0] for job in jobs}
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            txt_file = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                # The worker itself died (e.g. killed or out of memory)
+                logging.error(f"!!! Worker failed while converting {txt_file}: {e} !!!")
+            logging.info(f"Progress: {done_count}/{len(jobs)} file(s) processed.")
 
 
 if __name__ == '__main__':
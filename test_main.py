@@ -0,0 +1,83 @@
+import zipfile
+from xml.dom import minidom
+
+from PIL import Image
+
+from main import TextBookParser, TxtToEpubConverter, _render_chapter_html
+
+
+def test_write_epub_drops_characters_xml_does_not_allow(tmp_path):
+    txt_path = tmp_path / "book.txt"
+    txt_path.write_text("第一卷 甲\x08\n第一章 a\x1a\n正文\x1a结尾\n\x08x\n", encoding="utf-8")
+    epub_path = tmp_path / "book.epub"
+
+    book_structure = TextBookParser.read(str(txt_path))
+    converter = TxtToEpubConverter(str(txt_path), str(epub_path), "书\x1a\udcff\ud800", "作者\x0b",
+                                   output_folder=str(tmp_path / "tmp"))
+    converter._write_epub(book_structure, None)
+
+    with zipfile.ZipFile(epub_path) as epub_zip:
+        for name in epub_zip.namelist():
+            if name.endswith(('.xml', '.opf', '.ncx', '.xhtml', '.html')):
+                minidom.parseString(epub_zip.read(name)) # Raises if not well-formed
+        chapter = epub_zip.read('EPUB/002_001.html').decode('utf-8')
+    assert '<p>正文�结尾</p>' in chapter
+    assert '<h1>第一章 a�</h1>' in chapter
+
+
+def _read_structure(tmp_path, text):
+    """Parses text with TextBookParser and returns [(volume title, [chapter title, ...]), ...]."""
+    txt_path = tmp_path / "book.txt"
+    txt_path.write_text(text, encoding="utf-8")
+    book_structure = TextBookParser.read(str(txt_path))
+    return [(volume['title'], [chapter['title'] for chapter in volume['chapters']])
+            for volume in book_structure.volumes]
+
+
+def test_read_keeps_preface_when_empty_chapter_precedes_volume(tmp_path):
+    # The empty 第一章 A is dropped before the volume; the preface stays in the default chapter
+    assert _read_structure(tmp_path, "开头内容\n第一章 A\n第一卷 B\n第二章 C\n正文C\n") == [
+        ('默认卷', ['开篇']),
+        ('第一卷 B', ['第二章 C']),
+    ]
+
+
+def test_read_replaces_default_chapter_and_keeps_trailing_empty_chapter(tmp_path):
+    assert _read_structure(tmp_path, "第一章 a\nx\n第二章 b\n") == [('默认卷', ['第一章 a', '第二章 b'])]
+
+
+def test_read_volumes_before_any_chapter(tmp_path):
+    assert _read_structure(tmp_path, "第一卷 甲\n第一卷 乙\n第一章 a\nx\n") == [
+        ('默认卷', []),
+        ('第一卷 甲', []),
+        ('第一卷 乙', ['第一章 a']),
+    ]
+
+
+def test_chapter_content_is_rendered_html_bytes(tmp_path):
+    txt_path = tmp_path / "book.txt"
+    txt_path.write_text("第一章 <a>\n甲 & 乙\n<b>\n", encoding="utf-8")
+    chapter = TextBookParser.read(str(txt_path)).volumes[0]['chapters'][0]
+
+    assert isinstance(chapter['content'], bytearray)
+    assert chapter['content'] == '  <p>甲 &amp; 乙</p>\n  <p>&lt;b&gt;</p>\n'.encode('utf-8')
+    page = _render_chapter_html(chapter).decode('utf-8')
+    minidom.parseString(page)
+    assert '<title>第一章 &lt;a&gt;</title>' in page
+    assert '<h1>第一章 &lt;a&gt;</h1>\n  <p>甲 &amp; 乙</p>\n  <p>&lt;b&gt;</p>\n' in page
+
+
+def test_convert_labels_provided_cover_by_its_image_type(tmp_path):
+    txt_path = tmp_path / "book.txt"
+    txt_path.write_text("第一章 a\nx\n", encoding="utf-8")
+    cover_path = tmp_path / "cover.gif"
+    Image.new('RGB', (4, 4)).save(cover_path)
+    epub_path = tmp_path / "book.epub"
+
+    TxtToEpubConverter(str(txt_path), str(epub_path), "书", "作者", cover_image=str(cover_path),
+                       output_folder=str(tmp_path / "tmp")).convert()
+
+    with zipfile.ZipFile(epub_path) as epub_zip:
+        opf = epub_zip.read('EPUB/content.opf').decode('utf-8')
+        assert epub_zip.read('EPUB/cover.gif') == cover_path.read_bytes()
+    assert 'href="cover.gif" media-type="image/gif"' in opf